@@ -1,8 +1,20 @@
 import sys
+from collections import deque
 
 from crossword import *
 
 
+def bitset(positions, size):
+    """
+    Return the int with the bits in `positions` set, all below `size`.
+    """
+    # set the bits in a byte buffer and convert it to an int once
+    buffer = bytearray((size + 7) // 8)
+    for i in positions:
+        buffer[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buffer, "little")
+
+
 class CrosswordCreator():
 
     def __init__(self, crossword):
@@ -14,6 +26,16 @@ class CrosswordCreator():
             var: self.crossword.words.copy()
             for var in self.crossword.variables
         }
+        # neighbors and overlaps never change while solving, so compute them once
+        self._neighbors = {
+            var: frozenset(self.crossword.neighbors(var))
+            for var in self.crossword.variables
+        }
+        self._overlap = dict(self.crossword.overlaps)
+        self._degree = {var: len(self._neighbors[var]) for var in self.crossword.variables}
+        # the domains are encoded as bitsets once they are node consistent, or when first
+        # needed if revise or backtrack is called before that (see index_domains)
+        self.alive = None
 
     def letter_grid(self, assignment):
         """
@@ -103,18 +125,59 @@ class CrosswordCreator():
         # its domain is consistent with the variables unary constraints
 
         for variable in self.domains:
-            remove_words = []
-            # make sure that every word in the variable's domain has same num of letters
+            # keep only the words in the variable's domain that have same num of letters
             # as the variable's length (slots)
-            for word in set(self.domains[variable]):
-                # if the length of word does not match the variable length,
-                # append to remove words list
-                if variable.length != len(word):
-                    remove_words.append(word)
+            self.domains[variable] = {
+                word for word in self.domains[variable] if len(word) == variable.length
+            }
 
-            for word in remove_words:
-                # then remove word from list of specific variable
-                self.domains[variable].remove(word)
+        # every remaining word now has the variable's length, so index the domains by letter
+        self.index_domains()
+
+    def index_domains(self):
+        """
+        Encode the domains as bitsets. Each variable gets a fixed list of
+        candidate words, `self.words[variable]`, where bit i of a mask stands
+        for the ith word: `self.alive[variable]` is the mask of words still in
+        the domain, and `self.letter_masks[variable][k][letter]` is the mask
+        of candidate words that have `letter` at position k.
+        `self.word_index[variable][word]` is the bit of each word.
+        """
+        self.words = dict()
+        self.word_index = dict()
+        self.alive = dict()
+        self.letter_masks = dict()
+        for variable in self.domains:
+            words = sorted(self.domains[variable])
+            self.words[variable] = words
+            self.word_index[variable] = {word: i for i, word in enumerate(words)}
+            self.alive[variable] = (1 << len(words)) - 1
+
+            # collect the indices of the words with each letter at each position first,
+            # then set all their bits at once, rather than growing a mask one bit at a time
+            # (if indexed before node consistency, letters past the variable's length are
+            # never looked up, and a word too short for an overlap has no support there)
+            indices = [dict() for _ in range(variable.length)]
+            for i, word in enumerate(words):
+                for k in range(min(len(word), variable.length)):
+                    indices[k].setdefault(word[k], []).append(i)
+            self.letter_masks[variable] = [
+                {letter: bitset(positions, len(words)) for letter, positions in by_letter.items()}
+                for by_letter in indices
+            ]
+
+    def words_in(self, variable, mask):
+        """
+        Return the list of words of `variable` whose bits are set in `mask`.
+        """
+        words = self.words[variable]
+        found = []
+        while mask:
+            # isolate the lowest set bit and look up its word
+            low = mask & -mask
+            found.append(words[low.bit_length() - 1])
+            mask ^= low
+        return found
 
     def revise(self, x, y):
         """
@@ -131,29 +194,28 @@ class CrosswordCreator():
         # in domain of y, that does not cause conflict (cell between two variables does not disagree with character)
 
         # call overlaps function to see what overlaps for variables x and y
-        overlap = self.crossword.overlaps[x, y]
+        overlap = self._overlap[x, y]
         if not overlap:
             return False
 
         letterx, lettery = overlap
-        # track which words to remove
-        remove_values = set()
-
-        # for every value in the self.domains for variable x
-        for word_x in self.domains[x]:
-            consistent = False
-            for word_y in self.domains[y]:
-                # check whether the overlap has the same character, if so, then we are good
-                if word_x[letterx] == word_y[lettery]:
-                    consistent = True
-                    break
-            # if the word was not consistent and had conflicts, then add to remove values
-            if not consistent:
-                remove_values.add(word_x)
-
-        # iterate through remove words list and take them out of domain for variable
-        for word_x in remove_values:
-            self.domains[x].remove(word_x)
+        if self.alive is None:
+            self.index_domains()
+
+        # collect the words of x that share a letter at the overlap with some word
+        # still in the domain of y, one whole letter group at a time
+        alive_y = self.alive[y]
+        masks_x = self.letter_masks[x][letterx]
+        supported = 0
+        for letter, mask_y in self.letter_masks[y][lettery].items():
+            if mask_y & alive_y:
+                supported |= masks_x.get(letter, 0)
+
+        # every word of x left without support is removed from its domain
+        removed = self.alive[x] & ~supported
+        if removed:
+            self.alive[x] &= supported
+            self.domains[x] -= set(self.words_in(x, removed))
             revised = True
 
         return revised
@@ -168,19 +230,21 @@ class CrosswordCreator():
         return False if one or more domains end up empty.
         """
         # if arcs are None, have an initial list of all arcs in the problem
+        # (a deque, so that popping the first arc off the queue is O(1))
         if arcs is None:
-            arcs = []
-            for x in self.crossword.variables:
-                for y in self.crossword.neighbors(x):
-                    arcs.append((x, y))
+            arcs = deque(
+                (x, y)
+                for x in self.crossword.variables
+                for y in self._neighbors[x]
+            )
         else:
             # use 'arcs' as the inital list of arcs to make consistent
-            arcs = list(arcs)
+            arcs = deque(arcs)
 
         # while there are arcs in the list and we iterate through them
         while arcs:
             # pop first one of the arcs from the queue
-            (x, y) = arcs.pop(0)
+            (x, y) = arcs.popleft()
             # call revise function on x, y variables, and if it is true, continue
 
             if self.revise(x, y):
@@ -193,11 +257,22 @@ class CrosswordCreator():
                 # since we made a change to the domain, we need to add additional arcs to the queue
                 # to ensure that the arcs stay consistent
 
-                # so for all the 'y' variables that resulted in true for self.revise, we need to
-                # remove them from the self.cross.neighbors(x) and add arcs using other vars
-                for another_var in (self.crossword.neighbors(x) - self.domains[y]):
+                # only arcs (z, x) can have lost support, and y was just used to revise x,
+                # so re-queue the arcs from every other neighbor of x
+                for another_var in (self._neighbors[x] - {y}):
                     arcs.append((another_var, x))
-        return False
+        # the queue emptied without wiping out a domain, so every arc is consistent
+        return True
+
+    def restore_domains(self, saved):
+        """
+        Restore the domains to `saved`, a snapshot of `self.alive`, rebuilding
+        `self.domains` for every variable whose domain changed since.
+        """
+        for variable, mask in saved.items():
+            if mask != self.alive[variable]:
+                self.alive[variable] = mask
+                self.domains[variable] = set(self.words_in(variable, mask))
 
     def assignment_complete(self, assignment):
         """
@@ -233,17 +308,39 @@ class CrosswordCreator():
                 return False
 
             # check the neighboring words/variables
-            for neighbor in self.crossword.neighbors(variable):
+            for neighbor in self._neighbors[variable]:
                 # if the neighbor is in the assignment
                 if neighbor in assignment:
                     # check the overlapping cell of both the current variable and neighboring variable
-                    letteri, letterj = self.crossword.overlaps[variable, neighbor]
+                    letteri, letterj = self._overlap[variable, neighbor]
                     # if the overlapping letter does not match, then it is a conflicting character
                     if assignment[variable][letteri] != assignment[neighbor][letterj]:
                         # so, the assignment is not consistent
                         return False
         return True
 
+    def consistent_with(self, assignment, variable, value, assigned_words):
+        """
+        Return True if extending the consistent `assignment` with `variable`
+        set to `value` keeps it consistent; return False otherwise.
+        `assigned_words` is the set of words already used in `assignment`.
+        """
+        # all values of the assignment must be distinct
+        if value in assigned_words:
+            return False
+
+        # the value must have the correct length for the variable
+        if len(value) != variable.length:
+            return False
+
+        # only the neighbors of the new variable can conflict with it
+        for neighbor in self._neighbors[variable]:
+            if neighbor in assignment:
+                letteri, letterj = self._overlap[variable, neighbor]
+                if value[letteri] != assignment[neighbor][letterj]:
+                    return False
+        return True
+
     def order_domain_values(self, var, assignment):
         """
         Return a list of values in the domain of `var`, in order by
@@ -260,26 +357,33 @@ class CrosswordCreator():
         # when computing number of values ruled out for neighboring unassigned values
         conflicts = {}
 
-        unassigned_neighbors = self.crossword.neighbors(var) - set(assignment.keys())
+        unassigned_neighbors = self._neighbors[var] - set(assignment.keys())
+
+        # for every unassigned neighbor, count how many of its words have each letter
+        # at the overlap once, rather than once per value of 'var'
+        letter_counts = {}
+        if self.alive is None:
+            self.index_domains()
+        for neighbor in unassigned_neighbors:
+            # check the overlap between the variable present and neighboring variable
+            overlap = self._overlap[var, neighbor]
+            if overlap is not None:
+                # (i, j) square is the overlap
+                letterx, lettery = overlap
+                alive = self.alive[neighbor]
+                counts = {
+                    letter: (mask & alive).bit_count()
+                    for letter, mask in self.letter_masks[neighbor][lettery].items()
+                }
+                letter_counts[neighbor] = (letterx, counts)
 
         # iterate through the list of values in the domain of 'var'
         for value in self.domains[var]:
             # initialize the conflicts for a value to be zero (num values ruling out per word)
             conflicts[value] = 0
-            # for every neighbor of unassigned neighbors list
-            for neighbor in unassigned_neighbors:
-                # check the overlap between the variable present and neighboring variable
-                overlap = self.crossword.overlaps[var, neighbor]
-                if overlap is not None:
-                    # (i, j) square is the overlap
-                    letterx, lettery = overlap
-                    # count the number of values of the neighbor would be invalid if chosen
-                    # check for all other words in the neighboring variable, to see which values to rule out
-                    for another_value in self.domains[neighbor]:
-                        # check for which words there would be a conflict in characters
-                        if value[letterx] != another_value[lettery]:
-                            # keeps track of the conflicts by neighboring values per value in self.domain[var]
-                            conflicts[value] += 1
+            # every word of a neighbor without the value's letter at the overlap is ruled out
+            for neighbor, (letterx, counts) in letter_counts.items():
+                conflicts[value] += len(self.domains[neighbor]) - counts.get(value[letterx], 0)
 
         # return list of values by num of conflicts they cause
         return sorted(self.domains[var], key=lambda x: conflicts[x])
@@ -292,43 +396,29 @@ class CrosswordCreator():
         degree. If there is a tie, any of the tied variables are acceptable
         return values.
         """
-        unassigned_vars = []
-        # first add all the variables that are not within assignment to the unassigned list
-        for variable in self.crossword.variables:
-            if variable not in assignment:
-                unassigned_vars.append(variable)
-
-        # initialize variable for storing the variable with minimum remainig values
-        # set to positive infinity, as we want to iterate through all the unassigned vars
-        # and find the minimum, so compare with a initially high value first
-        min_values = float('inf')
-        # variable to store this var
-        chosen_var = None
-        # iterate through all the unassigned variables
-        for variable in unassigned_vars:
-            # if the length of the remaining values of variable is less than the current min remaining values
-            # then replace min_values with the length of remaining values of current 'variable'
-            if len(self.domains[variable]) < min_values:
-                min_values = len(self.domains[variable])
-                # set the chosen unassigned variable as the chosen variable
-                chosen_var = variable
-            # otherwise, if the length of remaning values equals the min values
-            elif len(self.domains[variable]) == min_values:
-                # check for the degree, and based on which degree is higher, change the chosen variable
-                max_degree = -1
-                if min_values is None or len(self.crossword.neighbors(variable)) > len(self.crossword.neighbors(chosen_var)):
-                    chosen_var = variable
-        return chosen_var
-
-    def backtrack(self, assignment):
+        # minimum remaining values first, then highest degree (hence the negated degree)
+        return min(
+            (variable for variable in self.crossword.variables if variable not in assignment),
+            key=lambda variable: (len(self.domains[variable]), -self._degree[variable]),
+            default=None
+        )
+
+    def backtrack(self, assignment, assigned_words=None):
         """
         Using Backtracking Search, take as input a partial assignment for the
         crossword and return a complete assignment if possible to do so.
 
         `assignment` is a mapping from variables (keys) to words (values).
+        `assigned_words` is the set of words used in `assignment`; it is
+        built from `assignment` if not given.
 
         If no assignment is possible, return None.
         """
+        if assigned_words is None:
+            assigned_words = set(assignment.values())
+        if self.alive is None:
+            self.index_domains()
+
         # first check whether assignment is complete or not, if so return it
         if self.assignment_complete(assignment):
             return assignment
@@ -338,26 +428,44 @@ class CrosswordCreator():
 
         # try to iterate through values with fewest conflicts with neighboring values first
         for value in self.order_domain_values(variable, assignment):
-            # make a copy of assignment for next step
-            copy_assignment = assignment.copy()
-            # set the next step of the assignment to the variable you have chosen and the value
-            copy_assignment[variable] = value
-            # check whether the assignment becomes consistent after adding a certain value,
+            # check whether the assignment stays consistent after adding a certain value,
             # if it is not consistent after iterating through all values, then return None
-            if self.consistent(copy_assignment):
-                # backtracking is recursive search algorithm, after assigning a value to a variable
-                # algorithm recursively attempts to assign values to other variables of assignment
-                # so explored the consequences of the current assignment
-                potential_path = self.backtrack(copy_assignment)
-                # checks whether the current assignment leads to a solution
-                # if the back track is not None, it indicates that the recursive search found a valid
-                # complete assignment from this point forward
-                if potential_path is not None:
-                    return potential_path
+            # (the assignment so far is consistent, so only the new value needs checking)
+            if self.consistent_with(assignment, variable, value, assigned_words):
+                # extend the assignment in place with the variable you have chosen and the value
+                # (it is rolled back below if the value does not lead to a solution)
+                assignment[variable] = value
+                assigned_words.add(value)
+                # snapshot the domains so the inferences below can be undone
+                saved = dict(self.alive)
+                # maintain arc consistency: shrink the variable's domain to the chosen value
+                # and propagate that to its unassigned neighbors before recursing, so dead
+                # ends are detected without exploring them
+                self.domains[variable] = {value}
+                self.alive[variable] = 1 << self.word_index[variable][value]
+                arcs = [
+                    (neighbor, variable)
+                    for neighbor in self._neighbors[variable]
+                    if neighbor not in assignment
+                ]
+                if self.ac3(arcs=arcs):
+                    # backtracking is recursive search algorithm, after assigning a value to a variable
+                    # algorithm recursively attempts to assign values to other variables of assignment
+                    # so explored the consequences of the current assignment
+                    potential_path = self.backtrack(assignment, assigned_words)
+                    # checks whether the current assignment leads to a solution
+                    # if the back track is not None, it indicates that the recursive search found a valid
+                    # complete assignment from this point forward
+                    if potential_path is not None:
+                        return potential_path
+
+                # undo the inferences made for this value before trying the next one
+                self.restore_domains(saved)
 
                 # if it does not have a solution with the current assignment
                 # remove the variable assignment that did not lead to a successful result
-                copy_assignment.pop(variable)
+                del assignment[variable]
+                assigned_words.remove(value)
 
         # no assignment possible, then just return none
         return None
@@ -36,6 +36,36 @@ PROBS = {
     "mutation": 0.01
 }
 
+# PROBS as tuples for the hot loops: GENE_LUT[num_genes] and
+# TRAIT_LUT[num_genes][has_trait] (a bool indexes as 0 or 1)
+GENE_LUT = tuple(PROBS["gene"][num_genes] for num_genes in range(3))
+TRAIT_LUT = tuple(
+    (PROBS["trait"][num_genes][False], PROBS["trait"][num_genes][True])
+    for num_genes in range(3)
+)
+
+# Probability that a parent with 0, 1 or 2 copies of the gene passes it on:
+# a copy is picked with probability num_genes / 2 and then may mutate
+PASS = {
+    0: PROBS["mutation"],
+    1: 0.5,
+    2: 1 - PROBS["mutation"]
+}
+
+# CHILD[mother_genes][father_genes][kid_genes] is the probability that a child
+# of parents with those gene counts has `kid_genes` copies of the gene
+CHILD = [
+    [
+        [
+            (1 - PASS[mother]) * (1 - PASS[father]),
+            PASS[mother] * (1 - PASS[father]) + (1 - PASS[mother]) * PASS[father],
+            PASS[mother] * PASS[father]
+        ]
+        for father in range(3)
+    ]
+    for mother in range(3)
+]
+
 
 def main():
 
@@ -60,26 +90,30 @@ def main():
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
+    # Number people, parents before children, so configurations can be
+    # tuples indexed by person and built up one person at a time
+    names = topological_order(people)
+    index = {name: i for i, name in enumerate(names)}
+    parents = [
+        (index[people[name]["mother"]], index[people[name]["father"]])
+        if people[name]["mother"] is not None else None
+        for name in names
+    ]
 
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
+    # Everyone's trait, or None if it is not known
+    traits = [people[name]["trait"] for name in names]
 
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
+    # Loop over all possible combinations of gene counts for everyone, with the
+    # probability of those gene counts and of the known traits
+    factors = person_factors(people, names, parents)
+    gene_totals, trait_totals = accumulate(factors, parents, traits)
 
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+    # Update probabilities with the accumulated joint probabilities
+    for i, name in enumerate(names):
+        for num_genes in probabilities[name]["gene"]:
+            probabilities[name]["gene"][num_genes] = gene_totals[i][num_genes]
+        for trait in probabilities[name]["trait"]:
+            probabilities[name]["trait"][trait] = trait_totals[i][trait]
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
@@ -116,16 +150,134 @@ def load_data(filename):
     return data
 
 
+def topological_order(people):
+    """
+    Return a list of the names in `people`, ordered so that everyone
+    comes after both of their parents.
+    """
+    order = []
+    visited = set()
+
+    def visit(name):
+        if name in visited:
+            return
+        visited.add(name)
+        for parent in (people[name]["mother"], people[name]["father"]):
+            if parent is not None:
+                visit(parent)
+        order.append(name)
+
+    for name in people:
+        visit(name)
+    return order
+
+
+def person_factors(people, names, parents):
+    """
+    Return a list with a table for everyone in `names` of the probability
+    of their gene count and, if it is known, of their trait. The table is
+    indexed by gene count for people without parents (`parents[i]` is
+    None), and by mother's, father's and own gene count otherwise.
+    """
+    factors = []
+    for i, name in enumerate(names):
+        # probability of the known trait for each gene count (1 if unknown)
+        trait = people[name]["trait"]
+        trait_factor = [
+            1 if trait is None else TRAIT_LUT[num_genes][trait]
+            for num_genes in range(3)
+        ]
+        if parents[i] is None:
+            factors.append([
+                GENE_LUT[num_genes] * trait_factor[num_genes]
+                for num_genes in range(3)
+            ])
+        else:
+            factors.append([
+                [
+                    [
+                        CHILD[mother][father][num_genes] * trait_factor[num_genes]
+                        for num_genes in range(3)
+                    ]
+                    for father in range(3)
+                ]
+                for mother in range(3)
+            ])
+    return factors
+
+
+def gene_configurations(factors, parents, genes=(), probability=1):
+    """
+    Yield (genes, probability) for every tuple of gene counts that extends
+    `genes`, where `probability` is the probability of those gene counts
+    and of everyone's known traits, given the tables from person_factors.
+
+    People must be numbered parents before their children, and `parents[i]`
+    is the pair of indices of the parents of person i, or None. Partial
+    configurations that are impossible are not extended.
+    """
+    i = len(genes)
+    if i == len(factors):
+        yield genes, probability
+        return
+
+    # the parents of this person come earlier, so their gene counts are known
+    if parents[i] is None:
+        table = factors[i]
+    else:
+        mother, father = parents[i]
+        table = factors[i][genes[mother]][genes[father]]
+
+    for num_genes in (0, 1, 2):
+        p = probability * table[num_genes]
+
+        # no completion of an impossible configuration contributes anything
+        if p == 0:
+            continue
+        yield from gene_configurations(factors, parents, genes + (num_genes,), p)
+
+
+def accumulate(factors, parents, traits):
+    """
+    Return (gene_totals, trait_totals): the sums of the joint probabilities
+    of every gene configuration (found with gene_configurations) combined
+    with every combination of the traits that are not known, indexed by
+    person and then by gene count or trait.
+    `traits[i]` is the trait of person i, or None if it is not known.
+    """
+    # Running totals of the joint probabilities
+    gene_totals = [[0, 0, 0] for _ in factors]
+    trait_totals = [[0, 0] for _ in factors]
+
+    for genes, gene_probability in gene_configurations(factors, parents):
+
+        # The probabilities of an unknown trait being False or True sum to 1,
+        # so summed over every combination of unknown traits, the joint
+        # probabilities add up to the gene probability, and those where
+        # person i has trait t add up to it times the probability of t alone
+        for i, num_genes in enumerate(genes):
+            gene_totals[i][num_genes] += gene_probability
+            trait = traits[i]
+            if trait is None:
+                trait_probabilities = TRAIT_LUT[num_genes]
+                trait_totals[i][False] += gene_probability * trait_probabilities[False]
+                trait_totals[i][True] += gene_probability * trait_probabilities[True]
+            else:
+                trait_totals[i][trait] += gene_probability
+
+    return gene_totals, trait_totals
+
+
 def powerset(s):
     """
-    Return a list of all possible subsets of set s.
+    Return a generator of all possible subsets of set s, as frozensets.
     """
     s = list(s)
-    return [
-        set(s) for s in itertools.chain.from_iterable(
+    return (
+        frozenset(subset) for subset in itertools.chain.from_iterable(
             itertools.combinations(s, r) for r in range(len(s) + 1)
         )
-    ]
+    )
 
 
 def check_genes(person, one_gene, two_genes):
@@ -146,7 +298,7 @@ def no_parents(num_genes, has_trait):
     """
     # for anyone with no parents, use probability distribution PROBS["gene"] to determine
     # the probability that they have a particular number of the gene
-    return PROBS["gene"][num_genes] * PROBS["trait"][num_genes][has_trait]
+    return GENE_LUT[num_genes] * TRAIT_LUT[num_genes][has_trait]
 
 
 def has_parent(person, people, one_gene, two_genes):
@@ -157,48 +309,10 @@ def has_parent(person, people, one_gene, two_genes):
     father = people[person]['father']
     father_genes = check_genes(father, one_gene, two_genes)
 
-    # after checking the number of genes the parent has, divide by 2 to get half the value
-    # bc, parent will pass one of their two genes (if they have any) on to their child
-    pass_gene_mom = mother_genes/2
-    pass_gene_dad = father_genes/2
-
-    # there is a PROBS["mutation"] chance that it mutates (goes from being the gene to not being the gene)
-    # if dad passes and no mutation
-    prob_dad_pass_no_mutate = pass_gene_dad*(1 - PROBS["mutation"])
-    # if dad passes and yes mutation
-    prob_dad_pass_yes_mutate = pass_gene_dad*PROBS["mutation"]
-    # if dad does not pass gene and no mutation
-    prob_dad_no_pass_no_mutate = (1 - pass_gene_dad)*(1 - PROBS["mutation"])
-    # if dad does not pass gene and yes mutation
-    prob_dad_no_pass_yes_mutate = (1 - pass_gene_dad)*PROBS["mutation"]
-
-    prob_mom_pass_no_mutate = pass_gene_mom*(1 - PROBS["mutation"])
-    prob_mom_pass_yes_mutate = pass_gene_mom*PROBS["mutation"]
-    prob_mom_no_pass_no_mutate = (1 - pass_gene_mom)*(1 - PROBS["mutation"])
-    prob_mom_no_pass_yes_mutate = (1 - pass_gene_mom)*PROBS["mutation"]
-
     # check the number of genes of child and proceed with calculating the probability
     kid_genes = check_genes(person, one_gene, two_genes)
 
-    # if the child has zero genes from parents (check cases of when mutation happens when both parents pass gene and so on)
-    if kid_genes == 0:
-        probability = (prob_dad_pass_yes_mutate*prob_mom_no_pass_no_mutate)+(prob_dad_pass_yes_mutate*prob_mom_pass_yes_mutate) + \
-            (prob_mom_pass_yes_mutate*prob_dad_no_pass_no_mutate) + \
-            (prob_dad_no_pass_no_mutate*prob_mom_no_pass_no_mutate)
-    # if the child has 1 gene from parents (check cases of when mutation happens when one of the parents pass gene and other parent passes gene without mutation and so on)
-    elif kid_genes == 1:
-        probability = (prob_dad_pass_yes_mutate*prob_mom_pass_no_mutate)+(prob_dad_pass_no_mutate*prob_mom_pass_yes_mutate) + \
-            (prob_dad_pass_no_mutate*prob_mom_no_pass_no_mutate)+(prob_dad_no_pass_no_mutate*prob_mom_pass_no_mutate) + \
-            (prob_dad_pass_yes_mutate*prob_mom_no_pass_yes_mutate)+(prob_dad_no_pass_yes_mutate*prob_mom_pass_yes_mutate) + \
-            (prob_dad_no_pass_no_mutate*prob_mom_no_pass_yes_mutate) + \
-            (prob_dad_no_pass_yes_mutate*prob_mom_no_pass_no_mutate)
-    # if the child has 2 genes from parents (check cases of when no mutation happens and both pass genes or mutation happens with both do not pass gene)
-    elif kid_genes == 2:
-        probability = (prob_dad_no_pass_yes_mutate*prob_mom_no_pass_yes_mutate)+(prob_dad_pass_no_mutate*prob_mom_pass_no_mutate) + \
-            (prob_dad_no_pass_yes_mutate*prob_mom_pass_no_mutate) + \
-            (prob_dad_pass_no_mutate*prob_mom_no_pass_yes_mutate)
-    # return this probability
-    return probability
+    return CHILD[mother_genes][father_genes][kid_genes]
 
 
 def joint_probability(people, one_gene, two_genes, have_trait):
@@ -228,7 +342,7 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         else:
             # make sure to multiply the probability returned from 'has_parent()' by the probability based on genes and trait
             probability *= (has_parent(person, people, one_gene, two_genes)) * \
-                PROBS["trait"][num_genes][hasTrait]
+                TRAIT_LUT[num_genes][hasTrait]
     return probability
 
 
@@ -1,5 +1,13 @@
 import itertools
 import random
+from collections import deque
+
+# Offsets from a cell to the cells within one row and column of it
+NEIGHBOR_OFFSETS = (
+    (-1, -1), (-1, 0), (-1, 1),
+    (0, -1), (0, 1),
+    (1, -1), (1, 0), (1, 1)
+)
 
 
 class Minesweeper():
@@ -15,20 +23,25 @@ class Minesweeper():
         self.mines = set()
 
         # Initialize an empty field with no mines
-        self.board = []
+        # (the board is a bitmask, where bit i * width + j is set if (i, j) is a mine)
+        self.board = 0
+
+        # Add mines randomly, sampling distinct cells so no placement is ever retried
+        for index in random.sample(range(height * width), mines):
+            self.mines.add(divmod(index, width))
+            self.board |= 1 << index
+
+        # Bitmask of the cells within one row and column of each cell,
+        # not including the cell itself
+        self.neighbor_masks = dict()
         for i in range(self.height):
-            row = []
             for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
-
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+                mask = 0
+                for di, dj in NEIGHBOR_OFFSETS:
+                    ni, nj = i + di, j + dj
+                    if 0 <= ni < height and 0 <= nj < width:
+                        mask |= 1 << (ni * width + nj)
+                self.neighbor_masks[i, j] = mask
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -41,7 +54,7 @@ class Minesweeper():
         for i in range(self.height):
             print("--" * self.width + "-")
             for j in range(self.width):
-                if self.board[i][j]:
+                if self.is_mine((i, j)):
                     print("|X", end="")
                 else:
                     print("| ", end="")
@@ -50,7 +63,7 @@ class Minesweeper():
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return bool(self.board >> (i * self.width + j) & 1)
 
     def nearby_mines(self, cell):
         """
@@ -59,23 +72,8 @@ class Minesweeper():
         not including the cell itself.
         """
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
+        # Count the mines among the cell's neighbors in one go
+        return (self.board & self.neighbor_masks[cell]).bit_count()
 
     def won(self):
         """
@@ -95,33 +93,68 @@ class Sentence():
         self.cells = set(cells)
         self.count = count
 
+        # key(), known_mines() and known_safes() are cached until the sentence changes
+        self._dirty = True
+        self._key = None
+        self._known_mines = None
+        self._known_safes = None
+
     def __eq__(self, other):
-        return self.cells == other.cells and self.count == other.count
+        # frozensets with different cached hashes are unequal without comparing their cells
+        return self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
 
     def __str__(self):
         return f"{self.cells} = {self.count}"
 
+    def key(self):
+        """
+        Returns (cells, count) with the cells as a frozenset,
+        so sentences can be hashed, e.g. to find duplicates in a set.
+        """
+        if self._dirty:
+            self._update_known()
+        return self._key
+
     def known_mines(self):
         """
         Returns the set of all cells in self.cells known to be mines.
         """
-        # in the sentence, if the number of cells is equal to the count,
-        # then return the set of cells as you know all of them have to be mines
-        if len(self.cells) == self.count and self.count != 0:
-            return self.cells
-        # else you are not sure which one is a mine or not, so return empty set
-        return set()
+        if self._dirty:
+            self._update_known()
+        return self._known_mines
 
     def known_safes(self):
         """
         Returns the set of all cells in self.cells known to be safe.
         """
-        # if the count is zero, then you know that there are no mines
-        # so the set of safe cells will be self.cells
+        if self._dirty:
+            self._update_known()
+        return self._known_safes
+
+    def _update_known(self):
+        """
+        Recomputes the cached key, known mines and known safes.
+        All cells are frozensets, so callers can iterate over them while marking cells.
+        """
+        cells = frozenset(self.cells)
+        self._key = (cells, self.count)
+        # in the sentence, if the number of cells is equal to the count,
+        # then you know all of them have to be mines
+        if len(self.cells) == self.count and self.count != 0:
+            self._known_mines = cells
+        # else you are not sure which one is a mine or not
+        else:
+            self._known_mines = frozenset()
+        # if the count is zero, then you know that there are no mines,
+        # so all the cells are safe; else you are not sure which are safe or not
         if self.count == 0:
-            return self.cells
-        # else you are not sure which are safe or not
-        return set()
+            self._known_safes = cells
+        else:
+            self._known_safes = frozenset()
+        self._dirty = False
 
     def mark_mine(self, cell):
         """
@@ -134,6 +167,7 @@ class Sentence():
         if cell in self.cells:
             self.cells.remove(cell)
             self.count -= 1
+            self._dirty = True
 
     def mark_safe(self, cell):
         """
@@ -144,6 +178,7 @@ class Sentence():
         # then remove from the list of cells
         if cell in self.cells:
             self.cells.remove(cell)
+            self._dirty = True
 
 
 class MinesweeperAI():
@@ -164,8 +199,16 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Sentences about the game known to be true, by an id given when they are added
+        # (a dict keeps them in the order they were added, and lets one be removed in O(1))
+        self.knowledge = dict()
+        self._next_id = 0
+
+        # Every cell on the board, to find available moves by set difference
+        self._all_cells = {(i, j) for i in range(height) for j in range(width)}
+
+        # Maps each cell to the ids in self.knowledge of the sentences containing it
+        self._cell_index = dict()
 
     def mark_mine(self, cell):
         """
@@ -173,8 +216,13 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
+        # only the sentences containing the cell change, and afterwards the cell is in none
+        for sentence_id in self._cell_index.pop(cell, ()):
+            sentence = self.knowledge[sentence_id]
             sentence.mark_mine(cell)
+            # a sentence with no cells left says nothing, so remove it from the knowledge base
+            if not sentence.cells:
+                del self.knowledge[sentence_id]
 
     def mark_safe(self, cell):
         """
@@ -182,8 +230,52 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
+        # only the sentences containing the cell change, and afterwards the cell is in none
+        for sentence_id in self._cell_index.pop(cell, ()):
+            sentence = self.knowledge[sentence_id]
             sentence.mark_safe(cell)
+            if not sentence.cells:
+                del self.knowledge[sentence_id]
+
+    def _add_sentence(self, sentence):
+        """
+        Adds a sentence to the knowledge base and indexes its cells.
+        Empty sentences say nothing, so they are not added.
+        """
+        if not sentence.cells:
+            return
+        sentence_id = self._next_id
+        self._next_id += 1
+        self.knowledge[sentence_id] = sentence
+        for cell in sentence.cells:
+            self._cell_index.setdefault(cell, set()).add(sentence_id)
+
+    def _enqueue_known(self, queue, sentence):
+        """
+        Appends the cells the sentence determines to the queue,
+        as (cell, is_mine) pairs.
+        """
+        queue.extend((cell, True) for cell in sentence.known_mines())
+        queue.extend((cell, False) for cell in sentence.known_safes())
+
+    def _propagate(self, queue):
+        """
+        Marks the (cell, is_mine) pairs in the queue as mines or safes,
+        queueing up whatever the sentences containing those cells then
+        determine, until nothing new is determined.
+        """
+        while queue:
+            cell, is_mine = queue.popleft()
+            if cell in self.mines or cell in self.safes:
+                continue
+            # the sentences containing the cell are the only ones that can become determined
+            affected = [self.knowledge[sentence_id] for sentence_id in self._cell_index.get(cell, ())]
+            if is_mine:
+                self.mark_mine(cell)
+            else:
+                self.mark_safe(cell)
+            for sentence in affected:
+                self._enqueue_known(queue, sentence)
 
     def add_knowledge(self, cell, count):
         """
@@ -204,73 +296,63 @@ class MinesweeperAI():
         self.moves_made.add(cell)
 
         # the move could have been made only if cell is safe to move to,
-        # so now we know that we can mark as safe
-        self.mark_safe(cell)
+        # so now we know that we can mark as safe (along with anything that follows from it)
+        self._propagate(deque([(cell, False)]))
 
         # keep track of the cells we are not sure of
         notSureCells = set()
-        # check the surrounding/neighboring cells
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-                # ignore the cell if its the cell you are currently on
-                # check constraints of cells location, then also check whether it is a safe or not
-                # then append to unsure list if its not a mine
-                if (i, j) != 1 and 0 <= i < self.height and 0 <= j < self.width:
-                    # if one of the surrounding cells is a mine, then increment mine count
-                    if (i, j) in self.mines:
-                        count -= 1
-                    else:
-                        notSureCells.add((i, j))
+        # check the surrounding/neighboring cells (the offsets skip the cell you are currently on)
+        ci, cj = cell
+        for di, dj in NEIGHBOR_OFFSETS:
+            i, j = ci + di, cj + dj
+            # check constraints of cells location, then append to unsure list if its not a mine
+            if 0 <= i < self.height and 0 <= j < self.width:
+                # if one of the surrounding cells is a mine, then decrement mine count
+                if (i, j) in self.mines:
+                    count -= 1
+                else:
+                    notSureCells.add((i, j))
         notSureCells -= self.safes
         notSureCells -= self.mines
         # with the new information, create a new sentence, with the unknown cells as the self.cells
         # and count being the previous count of mines - the newly discovered mines
         newSentence = Sentence(notSureCells, count)
         # append this new sentence to knowledge base
-        self.knowledge.append(newSentence)
+        self._add_sentence(newSentence)
 
-        # go through the knowledge base and update the information on board
-        for sentence in self.knowledge:
-            # mark any additional cells as safe or mines, based on the AI's knowledge base
-            if sentence.known_mines():
-                known_mines = sentence.known_mines().copy()
-                for cell in known_mines:
-                    self.mark_mine(cell)
-            if sentence.known_safes():
-                known_safes = sentence.known_safes().copy()
-                for cell in known_safes:
-                    self.mark_safe(cell)
+        # mark any additional cells as safe or mines, based on the new sentence
+        queue = deque()
+        self._enqueue_known(queue, newSentence)
+        self._propagate(queue)
 
         # go through the knowledge base and update the information on board
         deducedSentences = []
+        # sentences known or deduced so far, so duplicates are found by hashing
+        known_sentences = set(self.knowledge.values())
         # now check whether the cells in new sentence is already a part of another sentence cells in the knowledge base
-        for sentence1 in self.knowledge:
-            for sentence2 in self.knowledge:
+        for sentence1 in self.knowledge.values():
+            # the sentences containing every cell of sentence1 are exactly the ones it is a subset of
+            # (the knowledge base holds no empty sentences, so there is always a cell to start from)
+            supersets = set.intersection(*(self._cell_index[cell] for cell in sentence1.cells))
+            for sentence_id in supersets:
+                sentence2 = self.knowledge[sentence_id]
                 # now take the difference between the list of cells
-                if sentence1 != sentence2 and sentence1.cells.issubset(sentence2.cells):
+                if sentence1 != sentence2:
                     new_cells = sentence2.cells - sentence1.cells
                     new_count = sentence2.count - sentence1.count
                     # form a new sentence taking the difference, pass in the different cells and the difference of the count
                     deduced_sentence = Sentence(new_cells, new_count)
-                    if deduced_sentence not in self.knowledge and deduced_sentence not in deducedSentences:
+                    if deduced_sentence not in known_sentences:
+                        known_sentences.add(deduced_sentence)
                         deducedSentences.append(deduced_sentence)
 
-        self.knowledge.extend(deducedSentences)
-
-        for sentence in self.knowledge:
-            # mark any additional cells as safe or mines, based on the AI's knowledge base
-            if sentence.known_mines():
-                known_mines = sentence.known_mines().copy()
-                for cell in known_mines:
-                    self.mark_mine(cell)
-            if sentence.known_safes():
-                known_safes = sentence.known_safes().copy()
-                for cell in known_safes:
-                    self.mark_safe(cell)
+        for sentence in deducedSentences:
+            self._add_sentence(sentence)
+            self._enqueue_known(queue, sentence)
 
-        # remove any empty sets in knowledge base
-        empty_sentence = Sentence(set(), 0)
-        self.knowledge = [sentence for sentence in self.knowledge if sentence != empty_sentence]
+        # mark any additional cells as safe or mines, based on the deduced sentences
+        # (sentences emptied by marking cells are removed from the knowledge base as it happens)
+        self._propagate(queue)
 
     def make_safe_move(self):
         """
@@ -296,16 +378,9 @@ class MinesweeperAI():
             1) have not already been chosen, and
             2) are not known to be mines
         """
-        # to make a random move, search through all cells and find the available moves
-        availableMoves = []
-        for i in range(self.height):
-            for j in range(self.width):
-                # before adding cell to available moves list, check whether its not a mine
-                # or has not been made before
-                if (i, j) not in self.moves_made and (i, j) not in self.mines:
-                    availableMoves.append((i, j))
-        # as long as the number of moves in list is not zero, return a random move
-        if len(availableMoves) != 0:
-            # randomly choice one of the available moves
-            return random.choice(availableMoves)
+        # the available moves are all cells, except for moves made before and known mines
+        availableMoves = self._all_cells - self.moves_made - self.mines
+        # as long as there are available moves, randomly choose one of them
+        if availableMoves:
+            return random.choice(tuple(availableMoves))
         return None
@@ -1,6 +1,9 @@
 import nltk
+import re
 import sys
 
+from functools import lru_cache
+
 TERMINALS = """
 Adj -> "country" | "dreadful" | "enigmatical" | "little" | "moist" | "red"
 Adv -> "down" | "here" | "never"
@@ -21,6 +24,10 @@ VP -> V | V NP | VP PP | Adv VP | VP Adv | VP Conj VP
 PP -> P NP
 """
 
+# A word is a run of alphabetic characters that does not follow an apostrophe,
+# so clitics such as the 're of "we're" and the 's of "Holmes's" are skipped
+WORD = re.compile(r"(?<![A-Za-z'])[A-Za-z]+")
+
 grammar = nltk.CFG.fromstring(NONTERMINALS + TERMINALS)
 parser = nltk.ChartParser(grammar)
 
@@ -41,7 +48,7 @@ def main():
 
     # Attempt to parse sentence
     try:
-        trees = list(parser.parse(s))
+        trees = list(parse(tuple(s)))
     except ValueError as e:
         print(e)
         return
@@ -58,6 +65,16 @@ def main():
             print(" ".join(np.flatten()))
 
 
+@lru_cache(maxsize=1024)
+def parse(words):
+    """
+    Return a tuple of all parse trees of the tuple of words `words`.
+    Parsing only depends on the words and the fixed grammar, so repeated
+    sentences are looked up rather than parsed again.
+    """
+    return tuple(parser.parse(list(words)))
+
+
 def preprocess(sentence):
     """
     Convert `sentence` to a list of its words.
@@ -65,16 +82,11 @@ def preprocess(sentence):
     and removing any word that does not contain at least one alphabetic
     character.
     """
-    # perform tokenization
-    tokens = nltk.word_tokenize(sentence)
-
-    # lowercase the words
-    tokens = [token.lower() for token in tokens]
-
-    # any word that does not contain at lelast one alphabetic character should be excluded
-    # so check wehther token is an alphabetic char or not
-    tokens = [character for character in tokens if character.isalpha()]
-    return tokens
+    # tokenize, keep only the alphabetic words and lowercase them in a single pass.
+    # Unlike nltk.word_tokenize followed by isalpha(), "don't" gives "don" rather than "do",
+    # and a hyphenated or digit-split token such as "well-known" gives its alphabetic
+    # parts instead of being dropped
+    return [match.group(0).lower() for match in WORD.finditer(sentence)]
 
 
 def np_chunk(tree):
@@ -86,21 +98,27 @@ def np_chunk(tree):
     """
     nounPhraseChunks = []
 
-    # go through all the subtrees of the tree and find NP chunks
-    for subtree in tree.subtrees():
-        # check whether the current subtree has a label of 'NP'
-        # if so, check whether current subtree does not contain other NPs, otherwise it will be rules out
+    def contains_noun_phrase(subtree):
+        """
+        Walk `subtree` once, post-order, appending its noun phrase chunks, and
+        return whether it contains a noun phrase (including itself).
+        """
+        # leaves are plain words
+        if not isinstance(subtree, nltk.Tree):
+            return False
+        # every child must be walked to collect its chunks, so do not stop at the first NP
+        childContainsNounPhrase = False
+        for child in subtree:
+            if contains_noun_phrase(child):
+                childContainsNounPhrase = True
+        # an NP none of whose descendants is an NP is a chunk
         if subtree.label() == 'NP':
-            containsNounPhrase = False
-            # check for every child of subtree
-            for child in subtree:
-                if isinstance(child, nltk.Tree) and child.label() == 'NP':
-                    containsNounPhrase = True
-                    break
-            # if none of the children of subtree are labeled as NP, then append to list
-            if not containsNounPhrase:
+            if not childContainsNounPhrase:
                 nounPhraseChunks.append(subtree)
+            return True
+        return childContainsNounPhrase
 
+    contains_noun_phrase(tree)
     return nounPhraseChunks
 
 
@@ -1,8 +1,11 @@
 import csv
 import sys
 
+import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.neighbors import KNeighborsClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
 
 TEST_SIZE = 0.4
 
@@ -60,10 +63,6 @@ def load_data(filename):
     is 1 if Revenue is true, and 0 otherwise.
     """
 
-    # list which specifies the type of each column (1 - integer, 2 - floats, 3 - month, 4 - label)
-    column_types = [
-        1, 2, 1, 2, 1, 2, 2, 2, 2, 2, 3, 1, 1, 1, 1, 4, 4
-    ]
     month = {
         "Jan": 0,
         "Feb": 1,
@@ -79,7 +78,16 @@ def load_data(filename):
         "Dec": 11
     }
 
-    # store evidences of first 16 columns
+    # function converting each evidence column (the first 17) to its value
+    converters = [
+        int, float, int, float, int, float, float, float, float, float,
+        month.__getitem__,
+        int, int, int, int,
+        lambda visitor_type: 1 if visitor_type == "Returning_Visitor" else 0,
+        lambda weekend: 1 if weekend == "TRUE" else 0
+    ]
+
+    # store evidences of first 17 columns
     evidences = []
     # store label (last column)
     labels = []
@@ -87,36 +95,29 @@ def load_data(filename):
         reader = csv.reader(f)
         next(reader)
         for row in reader:
-            evidence = []
-            for i in range(16):
-                # based on the category, add item as the correct type into evidence list
-                if column_types[i] == 1:
-                    evidence.append(int(row[i]))
-                elif column_types[i] == 2:
-                    evidence.append(float(row[i]))
-                elif column_types[i] == 3:
-                    evidence.append(month[row[i]])
-                elif column_types[i] == 4:
-                    if row[i] == "TRUE" or row[i] == "Returning_Visitor":
-                        evidence.append(1)
-                    else:
-                        evidence.append(0)
-
-            evidences.append(evidence)
+            # convert every evidence column with its converter in one pass
+            evidences.append([convert(value) for convert, value in zip(converters, row)])
             # for label (last column), add separately to labels list
-            label = 1 if row[17] else 0
+            label = 1 if row[17] == "TRUE" else 0
             labels.append(label)
     return evidences, labels
 
 
-def train_model(evidence, labels):
+def train_model(evidence, labels, n_neighbors=1):
     """
     Given a list of evidence lists and a list of labels, return a
-    fitted k-nearest neighbor model (k=1) trained on the data.
+    fitted k-nearest neighbor model (k=1 by default) trained on the data.
     """
     # given the evidence and labels list from data (csv),
     # use the KNeighborsClassifier to create a model
-    model = KNeighborsClassifier(n_neighbors=1)
+    # features are standardized first, so that large durations do not dominate
+    # the distances, and neighbors are found with a k-d tree on all cores
+    model = make_pipeline(
+        StandardScaler(),
+        KNeighborsClassifier(
+            n_neighbors=n_neighbors, algorithm="kd_tree", leaf_size=40, n_jobs=-1
+        )
+    )
     # fitted model which is trained on the data
     model.fit(evidence, labels)
     return model
@@ -137,34 +138,20 @@ def evaluate(labels, predictions):
     representing the "true negative rate": the proportion of
     actual negative labels that were accurately identified.
     """
-    # the number of entries of data set
-    total_size = len(labels)
-    # the actual number of positives in dataset
-    total_positives = 0
-    # the actual number of negatives in dataset
-    total_negatives = 0
-    # the number of positives that were predicted correctly
-    correctly_predicted_positives = 0
-    # the number of negatives that were predicted correctly
-    correctly_predicted_negatives = 0
-
-    for i in range(total_size):
-        # if label from original dataset is positive
-        if labels[i] == 1:
-            total_positives += 1
-            if labels[i] == predictions[i]:
-                # increment value if the label and predicted value are same
-                correctly_predicted_positives += 1
-        # if label from original dataset is negative
-        elif labels[i] == 0:
-            total_negatives += 1
-            if labels[i] == predictions[i]:
-                # increment value if the label and predicted value are same
-                correctly_predicted_negatives += 1
-
-    sensitivity = correctly_predicted_positives/total_positives
-    
-    specificity = correctly_predicted_negatives/total_negatives
+    # compare the whole arrays of labels at once rather than one entry at a time
+    labels = np.asarray(labels, dtype=np.int8)
+    predictions = np.asarray(predictions, dtype=np.int8)
+
+    # the actual positives and negatives in dataset
+    positives = labels == 1
+    negatives = labels == 0
+    # the positives and negatives that were predicted correctly
+    correctly_predicted_positives = (positives & (predictions == 1)).sum()
+    correctly_predicted_negatives = (negatives & (predictions == 0)).sum()
+
+    # (max guards against a dataset without any positives or negatives)
+    sensitivity = float(correctly_predicted_positives / max(positives.sum(), 1))
+    specificity = float(correctly_predicted_negatives / max(negatives.sum(), 1))
 
     return sensitivity, specificity
 
@@ -3,66 +3,122 @@ Tic Tac Toe Player
 """
 
 import math
+from collections import namedtuple
+from functools import lru_cache
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# A board as the 9-bit masks of the cells taken by X and by O
+State = namedtuple("State", ["x_mask", "o_mask"])
+
+# Mask of all nine cells (cell (i, j) is bit 3 * i + j)
+FULL = 0b111111111
+
+# Masks of the cells of each row, column and diagonal
+WIN_LINES = (
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100
+)
+
+# Cells in the order moves are tried in: center, then corners, then edges.
+# Strong moves come first, so alpha-beta can prune the rest sooner
+MOVE_ORDER = (4, 0, 2, 6, 8, 1, 3, 5, 7)
+
+# Whether each 9-bit mask covers a whole row, column or diagonal, so a win is one lookup
+WINNING = tuple(any(mask & line == line for line in WIN_LINES) for mask in range(FULL + 1))
+
+
+def permute_masks(symmetry):
+    """
+    Returns a table mapping each 9-bit mask to the mask of the cells
+    that cell (i, j) is moved to by the symmetry, for every (i, j) in it.
+    """
+    table = []
+    for mask in range(FULL + 1):
+        permuted = 0
+        for i in range(3):
+            for j in range(3):
+                if mask >> (3 * i + j) & 1:
+                    (si, sj) = symmetry(i, j)
+                    permuted |= 1 << (3 * si + sj)
+        table.append(permuted)
+    return tuple(table)
+
+
+# For each of the 8 rotations and reflections of the board, the table of permuted masks
+SYMMETRIES = tuple(permute_masks(symmetry) for symmetry in (
+    lambda i, j: (i, j), lambda i, j: (j, 2 - i),
+    lambda i, j: (2 - i, 2 - j), lambda i, j: (2 - j, i),
+    lambda i, j: (i, 2 - j), lambda i, j: (2 - i, j),
+    lambda i, j: (j, i), lambda i, j: (2 - j, 2 - i)
+))
+
 
 def initial_state():
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    # boards are tuples of tuples, so a move can share the rows it leaves unchanged
+    return ((EMPTY, EMPTY, EMPTY),
+            (EMPTY, EMPTY, EMPTY),
+            (EMPTY, EMPTY, EMPTY))
 
 
-def player(board):
+def masks(board):
     """
-    Returns player who has the next turn on a board.
+    Returns the State of the board, i.e. the 9-bit masks of the cells taken
+    by X and by O. Cell (i, j) of the board is bit 3 * i + j.
     """
+    x_mask = 0
+    o_mask = 0
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            if cell == X:
+                x_mask |= 1 << (3 * i + j)
+            elif cell == O:
+                o_mask |= 1 << (3 * i + j)
+    return State(x_mask, o_mask)
 
-    # track the number of moves by player X and O
-    countX = 0
-    countO = 0
 
-    numRows = len(board)
+def has_won(mask):
+    # a player has won if their mask covers every cell of a row, column or diagonal
+    return WINNING[mask]
 
-    for row in range(numRows):
-        numCols = len(board[row])
-        for col in range(numCols):
-            # if the space (row, col) has X, then increment num of moves made by X
-            if board[row][col] == X:
-                countX += 1
-            # if the space (row, col) has O, then increment num of moves made by O
-            if board[row][col] == O:
-                countO += 1
 
+def evaluate(state):
+    """
+    Returns (terminal, utility, player) for the state: whether the game is over,
+    1 if X has won, -1 if O has won, 0 otherwise, and who has the next turn.
+    """
+    (x_mask, o_mask) = state
     # if the num of moves by X is more than moves by O, then its O's turn, otherwise X's turn
-    if countX > countO:
-        return O
-    else:
-        return X
+    turn = O if x_mask.bit_count() > o_mask.bit_count() else X
+    if has_won(x_mask):
+        return True, 1, turn
+    if has_won(o_mask):
+        return True, -1, turn
+    # with no winner, the game is over once every cell is taken
+    return x_mask | o_mask == FULL, 0, turn
 
 
-def actions(board):
+def player(board):
     """
-    Returns set of all possible actions (i, j) available on the board.
+    Returns player who has the next turn on a board.
     """
-    # create a set to store the possible moves that can be made
-    allPossibleActions = set()
-
-    numRows = len(board)
+    return evaluate(masks(board))[2]
 
-    for row in range(numRows):
-        numCols = len(board[row])
-        for col in range(numCols):
-            # if the space (row, col) does not contain X or O, then it is added as a possible move to the set
-            if board[row][col] == EMPTY:
-                allPossibleActions.add((row, col))
 
-    return allPossibleActions
+def actions(board):
+    """
+    Returns set of all possible actions (i, j) available on the board.
+    """
+    # the cells that contain neither X nor O are the possible moves
+    x_mask, o_mask = masks(board)
+    empty = ~(x_mask | o_mask) & FULL
+    return {divmod(bit, 3) for bit in range(9) if empty >> bit & 1}
 
 
 def result(board, action):
@@ -80,90 +136,30 @@ def result(board, action):
     if board[row][col] is not EMPTY:
         raise Exception("not a valid move")
 
-    # original board should be left unmodified, so created a copy, before making changes
-    copyOfboard = [row[:] for row in board]
+    # the new board is a tuple of tuples, so the original board is left unmodified; rows of a tuple
+    # board are shared as they are, but rows of a list board are converted so nothing is aliased.
     # given the action (row, col), mark the board with the player who has to go next, which can be determined by player() func.
-    copyOfboard[row][col] = player(board)
-    return copyOfboard
-
-
-def checkRow(board, player):
-    # check for winning game by 3 in a row
-    numRows = len(board)
-    # for each row in the board, if all the cells in a row for all cols contains all X's or O's, then return True
-    numCols = len(board[0])
-    for row in range(numRows):
-        if all(board[row][col] == player for col in range(numCols)):
-            return True
-    return False
-
-
-def checkCol(board, player):
-    # check for winning game by 3 in a col
-    numRows = len(board)
-    # for each col in the board, if all the cells in a col for all rows contains all X's or O's, then return True
-    numCols = len(board[0])
-    for col in range(numCols):
-        if all(board[row][col] == player for row in range(numRows)):
-            return True
-    return False
-
-
-def diagOne(board, player):
-    score = 0
-    numRows = len(board)
-    numCols = len(board[0])
-    for row in range(numRows):
-        for col in range(numCols):
-            # check the diagonal from left to right
-            if row == col and board[row][col] == player:
-                score += 1
-    # if the entire diagonal contains same value (player), then true
-    if score == len(board):
-        return True
-    else:
-        return False
-
-
-def diagTwo(board, player):
-    score = 0
-    numRows = len(board)
-    for i in range(numRows):
-        # the diagonal from right to left, so check the right most cell first
-        if board[i][len(board) - 1 - i] == player:
-            score += 1
-    if score == len(board):
-        return True
-    else:
-        return False
+    newRow = tuple(board[row][:col]) + (player(board),) + tuple(board[row][col + 1:])
+    return tuple(map(tuple, board[:row])) + (newRow,) + tuple(map(tuple, board[row + 1:]))
 
 
 def winner(board):
     """
     Returns the winner of the game, if there is one.
     """
-    # check whether X is winner or O is winner by calling all the helper functions created
-    if checkRow(board, X) or checkCol(board, X) or diagOne(board, X) or diagTwo(board, X):
+    # a player wins by taking every cell of a row, column or diagonal
+    (_, score, _) = evaluate(masks(board))
+    if score == 1:
         return X
-    elif checkRow(board, O) or checkCol(board, O) or diagOne(board, O) or diagTwo(board, O):
+    elif score == -1:
         return O
     return None
 
 
 def tie(board):
-    # check for a tie in the game
-    countEmpty = (len(board) * len(board[0]))
-    numRows = len(board)
-    numCols = len(board[0])
-    for row in range(numRows):
-        for col in range(numCols):
-            # check whether the cells in the board are empty or not
-            if board[row][col] is not EMPTY:
-                # if the cell is not empty, decrease the value of countEmpty
-                countEmpty -= 1
-
-    # by the end of checking the board, if the spaces are not empty and there is no winner, return True
-    return countEmpty == 0
+    # check for a tie in the game: every cell of the board is taken and there is no winner
+    (over, score, _) = evaluate(masks(board))
+    return over and score == 0
 
 
 def terminal(board):
@@ -171,48 +167,79 @@ def terminal(board):
     Returns True if game is over, False otherwise.
     """
     # terminates the game, if either there is a winner or there has been a tie
-    if winner(board) is not None or tie(board):
-        return True
-    else:
-        return False
+    return evaluate(masks(board))[0]
 
 
 def utility(board):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    # if X is the winner, returns 1
-    if winner(board) == X:
-        return 1
-    # if O is winner, return -1
-    if winner(board) == O:
-        return -1
-    # for a tie, return 0
-    return 0
+    return evaluate(masks(board))[1]
 
 
-def max_value(board):
+def canonical(state):
+    """
+    Returns the smallest of the 8 rotations and reflections of the state,
+    so that symmetric boards share one entry in the transposition table.
+    """
+    (x_mask, o_mask) = state
+    return State(*min((table[x_mask], table[o_mask]) for table in SYMMETRIES))
+
+
+def max_value(state, alpha=-math.inf, beta=math.inf):
+    # symmetric boards have the same value, so they are looked up by the canonical one
+    return max_search(canonical(state), alpha, beta)
+
+
+def min_value(state, alpha=-math.inf, beta=math.inf):
+    return min_search(canonical(state), alpha, beta)
+
+
+# the transposition table: the value found for each (board, alpha, beta) is cached,
+# so every position reached by a different move order is only searched once
+@lru_cache(maxsize=None)
+def max_search(state, alpha, beta):
+    (over, score, _) = evaluate(state)
+    if over:
+        return score
+    (x_mask, o_mask) = state
+    taken = x_mask | o_mask
     # set to negative infinity, bc X wants to find the maximum score or higher score
     v = -math.inf
-    if terminal(board):
-        return utility(board)
     # you are try to find the maximum value that would result from opposing players play
-    for action in actions(board):
+    for bit in MOVE_ORDER:
+        if taken >> bit & 1:
+            continue
         # call 'min_value' on the resulting board, to simulate O's optimal response
         # then try to get the maximum of the responses returned by 'min_value'
-        v = max(v, min_value(result(board, action)))
+        v = max(v, min_value(State(x_mask | 1 << bit, o_mask), alpha, beta))
+        # O already has a move elsewhere that keeps the score at beta or lower,
+        # so O will never let the game reach this board: stop searching it
+        if v >= beta:
+            return v
+        alpha = max(alpha, v)
     return v
 
 
-def min_value(board):
+@lru_cache(maxsize=None)
+def min_search(state, alpha, beta):
+    (over, score, _) = evaluate(state)
+    if over:
+        return score
+    (x_mask, o_mask) = state
+    taken = x_mask | o_mask
     v = math.inf
-    if terminal(board):
-        return utility(board)
     # you are try to find the minimum value that would result from opposing players play
-    for action in actions(board):
+    for bit in MOVE_ORDER:
+        if taken >> bit & 1:
+            continue
         # call 'max_value' on the resulting board, to simulate X's optimal response
         # then try to get the minimum value of the responses returned by 'max_value'
-        v = min(v, max_value(result(board, action)))
+        v = min(v, max_value(State(x_mask, o_mask | 1 << bit), alpha, beta))
+        # X already has a move elsewhere that keeps the score at alpha or higher
+        if v <= alpha:
+            return v
+        beta = min(beta, v)
     return v
 
 
@@ -220,21 +247,39 @@ def minimax(board):
     """
     Returns the optimal action for the current player on the board.
     """
+    # the board is only scanned once, everything else is worked out from its masks
+    state = masks(board)
+    (over, _, turn) = evaluate(state)
     # if the game is over, then return nothing
-    if terminal(board):
+    if over:
         return None
+    # alpha is the best score X is already sure of, beta the best score O is already sure of
+    alpha = -math.inf
+    beta = math.inf
+    bestAction = None
+    (x_mask, o_mask) = state
+    empty = ~(x_mask | o_mask) & FULL
     # in the case of when the player is X
-    elif player(board) == X:
-        options = []
+    if turn == X:
+        bestValue = -math.inf
         # check which action will result in the min_value for opposing player, and use the highest of the game value
-        for action in actions(board):
+        for bit in MOVE_ORDER:
+            if not empty >> bit & 1:
+                continue
             # when 'X' considers a move/action, it must account for O's best possible response,
             # hence, it calls 'min_value' to find out the worst case scenario for that move
-            options.append([min_value(result(board, action)), action])
-        return sorted(options, key=lambda x: x[0], reverse=True)[0][1]
-    elif player(board) == O:
-        options = []
-        for action in actions(board):
-            # tuple with max value and the action that results to its value
-            options.append([max_value(result(board, action)), action])
-        return sorted(options, key=lambda x: x[0])[0][1]
+            value = min_value(State(x_mask | 1 << bit, o_mask), alpha, beta)
+            if value > bestValue:
+                bestValue, bestAction = value, divmod(bit, 3)
+            alpha = max(alpha, value)
+    else:
+        bestValue = math.inf
+        for bit in MOVE_ORDER:
+            if not empty >> bit & 1:
+                continue
+            # the value X gets from its best response to the action
+            value = max_value(State(x_mask, o_mask | 1 << bit), alpha, beta)
+            if value < bestValue:
+                bestValue, bestAction = value, divmod(bit, 3)
+            beta = min(beta, value)
+    return bestAction